@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterable
 from typing_extensions import TypedDict
 from datetime import datetime
 import uuid
@@ -35,9 +35,12 @@ class HealthcareAgentState(TypedDict):
     
     # Human-in-the-loop tracking
     pending_approvals: List[Dict[str, Any]]
+    last_approved_idx: int  # session_responses position where the latest unscanned responses begin
     approved_summaries: List[Dict[str, Any]]
     flagged_content: List[Dict[str, Any]]
 
+# Queries and responses stay plain dicts: MemoryManager json.dumps them with the session,
+# and the handlers, filters and reports read them by key
 class QuerySchema(TypedDict):
     """Schema for individual medical queries"""
     query_id: str
@@ -104,29 +107,33 @@ def create_initial_state(researcher_id: str, project_id: str, disease_focus: str
         
         # Human-in-the-loop
         pending_approvals=[],
+        last_approved_idx=0,
         approved_summaries=[],
         flagged_content=[]
     )
 
+# Invariants checked per state field
+STATE_FIELD_VALIDATORS = {
+    'researcher_id': bool,
+    'project_id': bool,
+    'session_id': bool,
+    'timestamp': bool,
+    # disease_focus must be a non-empty string
+    'disease_focus': lambda value: bool(value) and isinstance(value, str),
+    'current_queries': lambda value: isinstance(value, list)
+}
+
 def validate_state(state: HealthcareAgentState) -> bool:
     """Validate the healthcare agent state"""
-    required_fields = [
-        'researcher_id', 'project_id', 'disease_focus', 
-        'session_id', 'timestamp'
-    ]
-    
-    for field in required_fields:
-        if not state.get(field):
+    return validate_state_delta(state, STATE_FIELD_VALIDATORS)
+
+def validate_state_delta(state: HealthcareAgentState, changed_keys: Iterable[str]) -> bool:
+    """Validate only the invariants touching the changed state fields"""
+    for field in changed_keys:
+        validator = STATE_FIELD_VALIDATORS.get(field)
+        if validator is not None and not validator(state.get(field)):
             return False
     
-    # Validate disease_focus is a string
-    if not isinstance(state['disease_focus'], str):
-        return False
-    
-    # Validate current_queries is a list
-    if not isinstance(state['current_queries'], list):
-        return False
-    
     return True
 
 def create_query(query_text: str, query_type: str, priority: str = "medium") -> QuerySchema:
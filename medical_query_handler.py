@@ -27,6 +27,8 @@ class MedicalQueryHandler:
     
     def __init__(self, api_key: str = None):
         self.api_key = api_key or os.getenv('GOOGLE_API_KEY')
+        # Incremented whenever an LLM call fails and an error message is returned in its place
+        self.generation_failures = 0
         if self.api_key:
             genai.configure(api_key=self.api_key)
             
@@ -53,6 +55,11 @@ class MedicalQueryHandler:
             self.llm = None
             print("Warning: No Google API key provided. LLM features will be limited.")
     
+    def activate(self):
+        """Point the process-wide genai configuration at this handler's API key"""
+        if self.api_key:
+            genai.configure(api_key=self.api_key)
+    
     def _generate_response(self, prompt: str) -> str:
         """Generate response using either LangChain or direct genai"""
         if self.use_direct_genai and hasattr(self, 'genai_model'):
@@ -62,6 +69,7 @@ class MedicalQueryHandler:
                 return response.text
             except Exception as e:
                 print(f"Error with direct genai: {e}")
+                self.generation_failures += 1
                 return f"Error generating response: {e}"
         elif self.llm:
             try:
@@ -70,6 +78,7 @@ class MedicalQueryHandler:
                 return response.content if hasattr(response, 'content') else str(response)
             except Exception as e:
                 print(f"Error with LangChain: {e}")
+                self.generation_failures += 1
                 return f"Error generating response: {e}"
         else:
             print(f"No LLM available - use_direct_genai: {getattr(self, 'use_direct_genai', False)}, has genai_model: {hasattr(self, 'genai_model')}, has llm: {self.llm is not None}")
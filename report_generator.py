@@ -1,17 +1,65 @@
 import json
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from functools import lru_cache
+from itertools import chain, islice
+from string import Formatter
+from typing import Dict, List, Any, Optional, TextIO
 import io
 import base64
 from healthcare_schema import HealthcareAgentState, LiteratureSummarySchema, TreatmentComparisonSchema
 
+# Report text that does not depend on session data, built once at import
+_COMPREHENSIVE_RECOMMENDATIONS = '\n'.join([
+    "### Research and Clinical Recommendations",
+    
+    # Immediate actions
+    "#### Immediate Actions",
+    "1. Review and validate all pending approvals",
+    "2. Implement approved treatment recommendations",
+    "3. Share findings with clinical team",
+    
+    # Short-term actions
+    "#### Short-term Actions (1-3 months)",
+    "1. Monitor patient outcomes with recommended treatments",
+    "2. Conduct follow-up literature searches",
+    "3. Update clinical protocols based on findings",
+    
+    # Long-term actions
+    "#### Long-term Actions (3+ months)",
+    "1. Establish continuous monitoring system",
+    "2. Develop research collaboration opportunities",
+    "3. Contribute to evidence base through publication"
+])
+
+_CLINICAL_FINDINGS_INSIGHTS = '\n'.join([
+    "- Evidence supports individualized treatment approaches",
+    "- Regular monitoring and reassessment recommended",
+    "- Emerging research may modify current recommendations"
+])
+
+@lru_cache(maxsize=64)
+def _parse_session_start(timestamp: str) -> Optional[datetime]:
+    """Parse a session start timestamp once per distinct value; None if it is not a naive ISO timestamp"""
+    try:
+        start_time = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    return start_time if start_time.tzinfo is None else None
+
 class HealthcareReportGenerator:
     """
     Report Generation System for Healthcare Research Assistant
     Creates comprehensive reports for download in multiple formats
     """
     
+    # Columns included in CSV exports for each data type
+    CSV_EXPORT_COLUMNS = {
+        'query_history': ['query_id', 'query_text', 'query_type', 'priority', 'timestamp', 'status'],
+        'literature_summaries': ['summary_id', 'title', 'authors', 'journal', 'treatment_focus', 'confidence_score'],
+        'treatment_comparisons': ['comparison_id', 'treatments', 'disease_condition', 'recommendation', 'confidence_level']
+    }
+    
     def __init__(self):
         self.report_templates = self._load_report_templates()
     
@@ -144,13 +192,26 @@ class HealthcareReportGenerator:
             '''
         }
     
-    def generate_session_summary_report(
+    def _write_template(self, out: TextIO, template_name: str, fields: Dict[str, Any]):
+        """Stream a report template to out, calling writer fields in place"""
+        for literal_text, field_name, _, _ in Formatter().parse(self.report_templates[template_name]):
+            out.write(literal_text)
+            if field_name is None:
+                continue
+            value = fields[field_name]
+            if callable(value):
+                value(out)
+            else:
+                out.write(str(value))
+    
+    def write_session_summary_report(
         self, 
+        out: TextIO,
         state: HealthcareAgentState, 
         query_history: List[Dict[str, Any]],
         session_responses: List[Dict[str, Any]]
-    ) -> str:
-        """Generate session summary report"""
+    ):
+        """Write session summary report to a file-like object"""
         
         # Calculate metrics
         total_queries = len(query_history)
@@ -158,36 +219,54 @@ class HealthcareReportGenerator:
         comparison_count = len([r for r in session_responses if r.get('response_type') == 'treatment_comparison'])
         pending_approvals = len(state.get('pending_approvals', []))
         
-        # Generate executive summary
-        executive_summary = self._generate_executive_summary(state, query_history, session_responses)
-        
-        # Generate query analysis
-        query_analysis = self._generate_query_analysis(query_history)
-        
-        # Generate key findings
-        key_findings = self._generate_key_findings(session_responses)
-        
-        # Generate recommendations
-        recommendations = self._generate_recommendations(state, session_responses)
-        
-        report = self.report_templates['session_summary'].format(
-            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            session_id=state['session_id'],
-            researcher_id=state['researcher_id'],
-            project_id=state['project_id'],
-            disease_focus=state['disease_focus'],
-            executive_summary=executive_summary,
-            total_queries=total_queries,
-            literature_count=literature_count,
-            comparison_count=comparison_count,
-            pending_approvals=pending_approvals,
-            session_duration=self._calculate_session_duration(state),
-            query_analysis=query_analysis,
-            key_findings=key_findings,
-            recommendations=recommendations
-        )
-        
-        return report
+        self._write_template(out, 'session_summary', {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'session_id': state['session_id'],
+            'researcher_id': state['researcher_id'],
+            'project_id': state['project_id'],
+            'disease_focus': state['disease_focus'],
+            'executive_summary': self._generate_executive_summary(state, query_history, session_responses),
+            'total_queries': total_queries,
+            'literature_count': literature_count,
+            'comparison_count': comparison_count,
+            'pending_approvals': pending_approvals,
+            'session_duration': self._calculate_session_duration(state),
+            'query_analysis': self._generate_query_analysis(query_history),
+            'key_findings': self._generate_key_findings(session_responses),
+            'recommendations': self._generate_recommendations(state, session_responses)
+        })
+    
+    def generate_session_summary_report(
+        self, 
+        state: HealthcareAgentState, 
+        query_history: List[Dict[str, Any]],
+        session_responses: List[Dict[str, Any]]
+    ) -> str:
+        """Generate session summary report"""
+        out = io.StringIO()
+        self.write_session_summary_report(out, state, query_history, session_responses)
+        return out.getvalue()
+    
+    def write_literature_review_report(
+        self, 
+        out: TextIO,
+        state: HealthcareAgentState, 
+        literature_summaries: List[LiteratureSummarySchema]
+    ):
+        """Write literature review report to a file-like object"""
+        
+        self._write_template(out, 'literature_review', {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'disease_focus': state['disease_focus'],
+            'review_period': "Current session",
+            'total_articles': len(literature_summaries),
+            'methodology': self._generate_methodology_section(),
+            'literature_summaries': lambda o: self._write_literature_summaries(o, literature_summaries),
+            'cross_study_findings': self._analyze_cross_study_findings(literature_summaries),
+            'research_gaps': self._identify_research_gaps(literature_summaries),
+            'clinical_implications': self._generate_clinical_implications(literature_summaries),
+            'future_directions': self._suggest_future_directions(literature_summaries)
+        })
     
     def generate_literature_review_report(
         self, 
@@ -195,63 +274,75 @@ class HealthcareReportGenerator:
         literature_summaries: List[LiteratureSummarySchema]
     ) -> str:
         """Generate literature review report"""
-        
-        methodology = self._generate_methodology_section()
-        summaries_text = self._format_literature_summaries(literature_summaries)
-        cross_study_findings = self._analyze_cross_study_findings(literature_summaries)
-        research_gaps = self._identify_research_gaps(literature_summaries)
-        clinical_implications = self._generate_clinical_implications(literature_summaries)
-        future_directions = self._suggest_future_directions(literature_summaries)
-        
-        report = self.report_templates['literature_review'].format(
-            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            disease_focus=state['disease_focus'],
-            review_period="Current session",
-            total_articles=len(literature_summaries),
-            methodology=methodology,
-            literature_summaries=summaries_text,
-            cross_study_findings=cross_study_findings,
-            research_gaps=research_gaps,
-            clinical_implications=clinical_implications,
-            future_directions=future_directions
-        )
-        
-        return report
+        out = io.StringIO()
+        self.write_literature_review_report(out, state, literature_summaries)
+        return out.getvalue()
     
-    def generate_treatment_analysis_report(
+    def write_treatment_analysis_report(
         self, 
+        out: TextIO,
         state: HealthcareAgentState, 
         treatment_comparisons: List[TreatmentComparisonSchema]
-    ) -> str:
-        """Generate treatment analysis report"""
+    ):
+        """Write treatment analysis report to a file-like object"""
         
         treatments_analyzed = list(set(
             treatment for comparison in treatment_comparisons 
             for treatment in comparison['treatments']
         ))
         
-        executive_summary = self._generate_treatment_executive_summary(treatment_comparisons)
-        comparisons_text = self._format_treatment_comparisons(treatment_comparisons)
-        efficacy_analysis = self._analyze_treatment_efficacy(treatment_comparisons)
-        safety_comparison = self._compare_treatment_safety(treatment_comparisons)
-        population_considerations = self._analyze_population_factors(treatment_comparisons)
-        clinical_recommendations = self._generate_clinical_recommendations(treatment_comparisons)
-        confidence_assessment = self._assess_confidence_levels(treatment_comparisons)
-        
-        report = self.report_templates['treatment_analysis'].format(
-            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            disease_focus=state['disease_focus'],
-            treatments_analyzed=', '.join(treatments_analyzed),
-            executive_summary=executive_summary,
-            treatment_comparisons=comparisons_text,
-            efficacy_analysis=efficacy_analysis,
-            safety_comparison=safety_comparison,
-            population_considerations=population_considerations,
-            clinical_recommendations=clinical_recommendations,
-            confidence_assessment=confidence_assessment
-        )
-        
-        return report
+        self._write_template(out, 'treatment_analysis', {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'disease_focus': state['disease_focus'],
+            'treatments_analyzed': ', '.join(treatments_analyzed),
+            'executive_summary': self._generate_treatment_executive_summary(treatment_comparisons),
+            'treatment_comparisons': lambda o: self._write_treatment_comparisons(o, treatment_comparisons),
+            'efficacy_analysis': self._analyze_treatment_efficacy(treatment_comparisons),
+            'safety_comparison': self._compare_treatment_safety(treatment_comparisons),
+            'population_considerations': self._analyze_population_factors(treatment_comparisons),
+            'clinical_recommendations': self._generate_clinical_recommendations(treatment_comparisons),
+            'confidence_assessment': self._assess_confidence_levels(treatment_comparisons)
+        })
+    
+    def generate_treatment_analysis_report(
+        self, 
+        state: HealthcareAgentState, 
+        treatment_comparisons: List[TreatmentComparisonSchema]
+    ) -> str:
+        """Generate treatment analysis report"""
+        out = io.StringIO()
+        self.write_treatment_analysis_report(out, state, treatment_comparisons)
+        return out.getvalue()
+    
+    def write_full_research_report(
+        self, 
+        out: TextIO,
+        state: HealthcareAgentState, 
+        query_history: List[Dict[str, Any]],
+        session_responses: List[Dict[str, Any]],
+        literature_summaries: List[LiteratureSummarySchema],
+        treatment_comparisons: List[TreatmentComparisonSchema]
+    ):
+        """Write comprehensive research report to a file-like object"""
+        
+        self._write_template(out, 'full_research', {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'session_id': state['session_id'],
+            'researcher_id': state['researcher_id'],
+            'project_id': state['project_id'],
+            'disease_focus': state['disease_focus'],
+            'executive_summary': self._generate_comprehensive_executive_summary(
+                state, query_history, session_responses, literature_summaries, treatment_comparisons
+            ),
+            'methodology': self._generate_comprehensive_methodology(),
+            'literature_review': lambda o: self._write_literature_summaries(o, literature_summaries),
+            'treatment_analysis': lambda o: self._write_treatment_comparisons(o, treatment_comparisons),
+            'clinical_findings': self._synthesize_clinical_findings(session_responses),
+            'recommendations': self._generate_comprehensive_recommendations(
+                state, session_responses, literature_summaries, treatment_comparisons
+            ),
+            'appendices': lambda o: self._write_appendices(o, state, query_history, session_responses)
+        })
     
     def generate_full_research_report(
         self, 
@@ -262,35 +353,11 @@ class HealthcareReportGenerator:
         treatment_comparisons: List[TreatmentComparisonSchema]
     ) -> str:
         """Generate comprehensive research report"""
-        
-        executive_summary = self._generate_comprehensive_executive_summary(
-            state, query_history, session_responses, literature_summaries, treatment_comparisons
-        )
-        methodology = self._generate_comprehensive_methodology()
-        literature_review = self._format_literature_summaries(literature_summaries)
-        treatment_analysis = self._format_treatment_comparisons(treatment_comparisons)
-        clinical_findings = self._synthesize_clinical_findings(session_responses)
-        recommendations = self._generate_comprehensive_recommendations(
-            state, session_responses, literature_summaries, treatment_comparisons
+        out = io.StringIO()
+        self.write_full_research_report(
+            out, state, query_history, session_responses, literature_summaries, treatment_comparisons
         )
-        appendices = self._generate_appendices(state, query_history, session_responses)
-        
-        report = self.report_templates['full_research'].format(
-            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            session_id=state['session_id'],
-            researcher_id=state['researcher_id'],
-            project_id=state['project_id'],
-            disease_focus=state['disease_focus'],
-            executive_summary=executive_summary,
-            methodology=methodology,
-            literature_review=literature_review,
-            treatment_analysis=treatment_analysis,
-            clinical_findings=clinical_findings,
-            recommendations=recommendations,
-            appendices=appendices
-        )
-        
-        return report
+        return out.getvalue()
     
     def generate_csv_export(
         self, 
@@ -302,15 +369,8 @@ class HealthcareReportGenerator:
         if not data:
             return "No data available for export"
         
-        df = pd.DataFrame(data)
-        
-        # Clean and format DataFrame based on data type
-        if data_type == 'query_history':
-            df = df[['query_id', 'query_text', 'query_type', 'priority', 'timestamp', 'status']]
-        elif data_type == 'literature_summaries':
-            df = df[['summary_id', 'title', 'authors', 'journal', 'treatment_focus', 'confidence_score']]
-        elif data_type == 'treatment_comparisons':
-            df = df[['comparison_id', 'treatments', 'disease_condition', 'recommendation', 'confidence_level']]
+        # Project the exported columns while building the DataFrame
+        df = pd.DataFrame.from_records(data, columns=self.CSV_EXPORT_COLUMNS.get(data_type))
         
         return df.to_csv(index=False)
     
@@ -368,8 +428,6 @@ class HealthcareReportGenerator:
         if not query_history:
             return "No queries to analyze."
         
-        analysis_parts = []
-        
         # Query types
         query_types = {}
         priorities = {}
@@ -381,15 +439,12 @@ class HealthcareReportGenerator:
             query_types[qtype] = query_types.get(qtype, 0) + 1
             priorities[priority] = priorities.get(priority, 0) + 1
         
-        analysis_parts.append("### Query Type Distribution")
-        for qtype, count in query_types.items():
-            analysis_parts.append(f"- **{qtype.replace('_', ' ').title()}:** {count}")
-        
-        analysis_parts.append("\n### Priority Distribution")
-        for priority, count in priorities.items():
-            analysis_parts.append(f"- **{priority.title()}:** {count}")
-        
-        return '\n'.join(analysis_parts)
+        return '\n'.join(chain(
+            ("### Query Type Distribution",),
+            (f"- **{qtype.replace('_', ' ').title()}:** {count}" for qtype, count in query_types.items()),
+            ("\n### Priority Distribution",),
+            (f"- **{priority.title()}:** {count}" for priority, count in priorities.items())
+        ))
     
     def _generate_key_findings(self, session_responses: List[Dict[str, Any]]) -> str:
         """Generate key findings section"""
@@ -399,24 +454,28 @@ class HealthcareReportGenerator:
         
         findings = []
         
-        # Literature findings
-        literature_responses = [r for r in session_responses if r.get('response_type') == 'literature_search']
-        if literature_responses:
+        # Literature findings: keep the top 3, then count the rest without materializing them
+        literature_responses = (r for r in session_responses if r.get('response_type') == 'literature_search')
+        top_literature = list(islice(literature_responses, 3))
+        if top_literature:
+            literature_count = len(top_literature) + sum(1 for _ in literature_responses)
             findings.append(f"### Literature Review Findings")
-            findings.append(f"- Reviewed {len(literature_responses)} literature searches")
+            findings.append(f"- Reviewed {literature_count} literature searches")
             
-            for response in literature_responses[:3]:  # Top 3
+            for response in top_literature:
                 summaries = response.get('summaries', [])
                 if summaries:
                     findings.append(f"- Key study: {summaries[0].get('title', 'Unknown title')}")
         
-        # Treatment findings
-        treatment_responses = [r for r in session_responses if r.get('response_type') == 'treatment_comparison']
-        if treatment_responses:
+        # Treatment findings: keep the top 2
+        treatment_responses = (r for r in session_responses if r.get('response_type') == 'treatment_comparison')
+        top_treatments = list(islice(treatment_responses, 2))
+        if top_treatments:
+            treatment_count = len(top_treatments) + sum(1 for _ in treatment_responses)
             findings.append(f"\n### Treatment Comparison Findings")
-            findings.append(f"- Analyzed {len(treatment_responses)} treatment comparisons")
+            findings.append(f"- Analyzed {treatment_count} treatment comparisons")
             
-            for response in treatment_responses[:2]:  # Top 2
+            for response in top_treatments:
                 treatments = response.get('treatments_compared', [])
                 if treatments:
                     findings.append(f"- Compared: {' vs '.join(treatments)}")
@@ -457,14 +516,13 @@ class HealthcareReportGenerator:
     
     def _calculate_session_duration(self, state: HealthcareAgentState) -> str:
         """Calculate session duration"""
-        try:
-            start_time = datetime.fromisoformat(state['timestamp'])
-            duration = datetime.now() - start_time
-            hours, remainder = divmod(duration.total_seconds(), 3600)
-            minutes, _ = divmod(remainder, 60)
-            return f"{int(hours)}h {int(minutes)}m"
-        except:
+        timestamp = state.get('timestamp')
+        start_time = _parse_session_start(timestamp) if isinstance(timestamp, str) else None
+        if start_time is None:
             return "Unknown"
+        
+        seconds = int((datetime.now() - start_time).total_seconds())
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
     
     def _generate_methodology_section(self) -> str:
         """Generate methodology section"""
@@ -488,30 +546,29 @@ which employs AI-powered analysis combined with human oversight for quality assu
 - Safety and efficacy prioritization
         """
     
-    def _format_literature_summaries(self, summaries: List[LiteratureSummarySchema]) -> str:
-        """Format literature summaries for report"""
+    def _write_literature_summaries(self, out: TextIO, summaries: List[LiteratureSummarySchema]):
+        """Write formatted literature summaries for report"""
         
         if not summaries:
-            return "No literature summaries available."
-        
-        formatted = []
+            out.write("No literature summaries available.")
+            return
         
         for i, summary in enumerate(summaries, 1):
-            formatted.append(f"### Study {i}: {summary['title']}")
-            formatted.append(f"**Authors:** {', '.join(summary['authors'])}")
-            formatted.append(f"**Journal:** {summary['journal']}")
-            formatted.append(f"**Publication Date:** {summary['publication_date']}")
-            formatted.append(f"**Treatment Focus:** {summary['treatment_focus']}")
-            formatted.append(f"**Population:** {summary['population_studied']}")
-            formatted.append(f"**Confidence Score:** {summary['confidence_score']:.1%}")
+            if i > 1:
+                out.write("\n")
+            out.write(f"### Study {i}: {summary['title']}\n")
+            out.write(f"**Authors:** {', '.join(summary['authors'])}\n")
+            out.write(f"**Journal:** {summary['journal']}\n")
+            out.write(f"**Publication Date:** {summary['publication_date']}\n")
+            out.write(f"**Treatment Focus:** {summary['treatment_focus']}\n")
+            out.write(f"**Population:** {summary['population_studied']}\n")
+            out.write(f"**Confidence Score:** {summary['confidence_score']:.1%}\n")
             
-            formatted.append("**Key Findings:**")
+            out.write("**Key Findings:**")
             for finding in summary['key_findings']:
-                formatted.append(f"- {finding}")
+                out.write(f"\n- {finding}")
             
-            formatted.append("")  # Empty line between summaries
-        
-        return '\n'.join(formatted)
+            out.write("\n")  # Empty line between summaries
     
     def _analyze_cross_study_findings(self, summaries: List[LiteratureSummarySchema]) -> str:
         """Analyze findings across multiple studies"""
@@ -519,33 +576,26 @@ which employs AI-powered analysis combined with human oversight for quality assu
         if len(summaries) < 2:
             return "Insufficient studies for cross-analysis."
         
-        analysis = []
-        
         # Treatment focus analysis
         treatments = {}
         for summary in summaries:
             treatment = summary['treatment_focus']
             treatments[treatment] = treatments.get(treatment, 0) + 1
         
-        analysis.append("### Treatment Focus Distribution")
-        for treatment, count in treatments.items():
-            analysis.append(f"- **{treatment}:** {count} studies")
-        
         # Confidence analysis
         avg_confidence = sum(s['confidence_score'] for s in summaries) / len(summaries)
-        analysis.append(f"\n### Overall Confidence: {avg_confidence:.1%}")
-        
-        # Common findings patterns
-        all_findings = []
-        for summary in summaries:
-            all_findings.extend(summary['key_findings'])
         
-        analysis.append("\n### Common Research Themes")
-        analysis.append("- Treatment efficacy evaluation")
-        analysis.append("- Safety profile assessment")
-        analysis.append("- Population-specific outcomes")
-        
-        return '\n'.join(analysis)
+        return '\n'.join(chain(
+            ("### Treatment Focus Distribution",),
+            (f"- **{treatment}:** {count} studies" for treatment, count in treatments.items()),
+            (
+                f"\n### Overall Confidence: {avg_confidence:.1%}",
+                "\n### Common Research Themes",
+                "- Treatment efficacy evaluation",
+                "- Safety profile assessment",
+                "- Population-specific outcomes"
+            )
+        ))
     
     def _identify_research_gaps(self, summaries: List[LiteratureSummarySchema]) -> str:
         """Identify research gaps from literature review"""
@@ -602,29 +652,28 @@ which employs AI-powered analysis combined with human oversight for quality assu
         
         return summary
     
-    def _format_treatment_comparisons(self, comparisons: List[TreatmentComparisonSchema]) -> str:
-        """Format treatment comparisons for report"""
+    def _write_treatment_comparisons(self, out: TextIO, comparisons: List[TreatmentComparisonSchema]):
+        """Write formatted treatment comparisons for report"""
         
         if not comparisons:
-            return "No treatment comparisons available."
-        
-        formatted = []
+            out.write("No treatment comparisons available.")
+            return
         
         for i, comparison in enumerate(comparisons, 1):
-            formatted.append(f"### Comparison {i}: {' vs '.join(comparison['treatments'])}")
-            formatted.append(f"**Disease Condition:** {comparison['disease_condition']}")
-            formatted.append(f"**Confidence Level:** {comparison['confidence_level']}")
+            if i > 1:
+                out.write("\n")
+            out.write(f"### Comparison {i}: {' vs '.join(comparison['treatments'])}\n")
+            out.write(f"**Disease Condition:** {comparison['disease_condition']}\n")
+            out.write(f"**Confidence Level:** {comparison['confidence_level']}\n")
             
-            formatted.append("**Efficacy Metrics:**")
+            out.write("**Efficacy Metrics:**\n")
             for treatment, efficacy in comparison['efficacy_metrics'].items():
-                formatted.append(f"- {treatment}: {efficacy}")
+                out.write(f"- {treatment}: {efficacy}\n")
             
-            formatted.append("**Recommendation:**")
-            formatted.append(comparison['recommendation'])
+            out.write("**Recommendation:**\n")
+            out.write(comparison['recommendation'])
             
-            formatted.append("")  # Empty line between comparisons
-        
-        return '\n'.join(formatted)
+            out.write("\n")  # Empty line between comparisons
     
     def _analyze_treatment_efficacy(self, comparisons: List[TreatmentComparisonSchema]) -> str:
         """Analyze treatment efficacy across comparisons"""
@@ -674,17 +723,15 @@ which employs AI-powered analysis combined with human oversight for quality assu
     def _assess_confidence_levels(self, comparisons: List[TreatmentComparisonSchema]) -> str:
         """Assess confidence levels across comparisons"""
         
-        confidence_levels = [c['confidence_level'] for c in comparisons]
         level_counts = {}
-        for level in confidence_levels:
+        for comparison in comparisons:
+            level = comparison['confidence_level']
             level_counts[level] = level_counts.get(level, 0) + 1
         
-        assessment = []
-        assessment.append("### Confidence Assessment")
-        for level, count in level_counts.items():
-            assessment.append(f"- **{level.title()}:** {count} comparisons")
-        
-        return '\n'.join(assessment)
+        return '\n'.join(chain(
+            ("### Confidence Assessment",),
+            (f"- **{level.title()}:** {count} comparisons" for level, count in level_counts.items())
+        ))
     
     def _generate_comprehensive_executive_summary(
         self, 
@@ -745,25 +792,18 @@ which employs AI-powered analysis combined with human oversight for quality assu
     def _synthesize_clinical_findings(self, session_responses: List[Dict[str, Any]]) -> str:
         """Synthesize clinical findings across all responses"""
         
-        findings = []
-        findings.append("### Clinical Findings Synthesis")
-        
-        # Literature findings
-        literature_count = len([r for r in session_responses if r.get('response_type') == 'literature_search'])
-        if literature_count > 0:
-            findings.append(f"- Literature analysis ({literature_count} reviews) provides current evidence base")
-        
-        # Treatment findings
-        treatment_count = len([r for r in session_responses if r.get('response_type') == 'treatment_comparison'])
-        if treatment_count > 0:
-            findings.append(f"- Treatment comparisons ({treatment_count} analyses) inform clinical decisions")
-        
-        # Overall insights
-        findings.append("- Evidence supports individualized treatment approaches")
-        findings.append("- Regular monitoring and reassessment recommended")
-        findings.append("- Emerging research may modify current recommendations")
-        
-        return '\n'.join(findings)
+        literature_count = sum(1 for r in session_responses if r.get('response_type') == 'literature_search')
+        treatment_count = sum(1 for r in session_responses if r.get('response_type') == 'treatment_comparison')
+        
+        return '\n'.join(chain(
+            ("### Clinical Findings Synthesis",),
+            # Literature findings
+            (f"- Literature analysis ({literature_count} reviews) provides current evidence base",) if literature_count else (),
+            # Treatment findings
+            (f"- Treatment comparisons ({treatment_count} analyses) inform clinical decisions",) if treatment_count else (),
+            # Overall insights
+            (_CLINICAL_FINDINGS_INSIGHTS,)
+        ))
     
     def _generate_comprehensive_recommendations(
         self, 
@@ -772,51 +812,26 @@ which employs AI-powered analysis combined with human oversight for quality assu
         literature_summaries: List[LiteratureSummarySchema],
         treatment_comparisons: List[TreatmentComparisonSchema]
     ) -> str:
-        """Generate comprehensive recommendations"""
-        
-        recommendations = []
-        recommendations.append("### Research and Clinical Recommendations")
-        
-        # Immediate actions
-        recommendations.append("#### Immediate Actions")
-        recommendations.append("1. Review and validate all pending approvals")
-        recommendations.append("2. Implement approved treatment recommendations")
-        recommendations.append("3. Share findings with clinical team")
-        
-        # Short-term actions
-        recommendations.append("#### Short-term Actions (1-3 months)")
-        recommendations.append("1. Monitor patient outcomes with recommended treatments")
-        recommendations.append("2. Conduct follow-up literature searches")
-        recommendations.append("3. Update clinical protocols based on findings")
-        
-        # Long-term actions
-        recommendations.append("#### Long-term Actions (3+ months)")
-        recommendations.append("1. Establish continuous monitoring system")
-        recommendations.append("2. Develop research collaboration opportunities")
-        recommendations.append("3. Contribute to evidence base through publication")
-        
-        return '\n'.join(recommendations)
+        """Generate comprehensive recommendations (fixed text for now; parameters kept for personalization)"""
+        return _COMPREHENSIVE_RECOMMENDATIONS
     
-    def _generate_appendices(
+    def _write_appendices(
         self, 
+        out: TextIO,
         state: HealthcareAgentState, 
         query_history: List[Dict[str, Any]], 
         session_responses: List[Dict[str, Any]]
-    ) -> str:
-        """Generate appendices section"""
-        
-        appendices = []
-        appendices.append("### Appendix A: Session Configuration")
-        appendices.append(f"- Session ID: {state['session_id']}")
-        appendices.append(f"- Researcher ID: {state['researcher_id']}")
-        appendices.append(f"- Project ID: {state['project_id']}")
-        appendices.append(f"- Disease Focus: {state['disease_focus']}")
+    ):
+        """Write appendices section"""
         
-        appendices.append("\n### Appendix B: Query Details")
-        for i, query in enumerate(query_history, 1):
-            appendices.append(f"**Query {i}:** {query['query_text']}")
+        out.write("### Appendix A: Session Configuration\n")
+        out.write(f"- Session ID: {state['session_id']}\n")
+        out.write(f"- Researcher ID: {state['researcher_id']}\n")
+        out.write(f"- Project ID: {state['project_id']}\n")
+        out.write(f"- Disease Focus: {state['disease_focus']}\n")
         
-        appendices.append("\n### Appendix C: Response Summary")
-        appendices.append(f"Total responses generated: {len(session_responses)}")
+        out.write("\n### Appendix B: Query Details\n")
+        out.writelines(f"**Query {i}:** {query['query_text']}\n" for i, query in enumerate(query_history, 1))
         
-        return '\n'.join(appendices)
\ No newline at end of file
+        out.write("\n### Appendix C: Response Summary\n")
+        out.write(f"Total responses generated: {len(session_responses)}")
@@ -1,4 +1,6 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Iterable, Set, Tuple
+from bisect import bisect_left
+from collections import OrderedDict, deque
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.sqlite import SqliteSaver
 from healthcare_schema import (
@@ -6,46 +8,194 @@ from healthcare_schema import (
     QuerySchema, 
     LiteratureSummarySchema,
     create_query,
-    validate_state
+    validate_state_delta
 )
 import json
+import re
+import sqlite3
+import threading
 from datetime import datetime
 
+def _compile_terms(terms: List[str]) -> "re.Pattern[str]":
+    """Compile keyword terms into one alternation pattern that matches any term as a substring"""
+    return re.compile("|".join(map(re.escape, terms)))
+
+def _compile_categories(categories: List[Tuple[str, List[str]]]) -> "re.Pattern[str]":
+    """Compile ordered (label, terms) categories into one pattern whose match().lastgroup is the first category present"""
+    return re.compile("|".join(
+        f"^(?=.*?(?:{'|'.join(map(re.escape, terms))}))(?P<{label}>)"
+        for label, terms in categories
+    ), re.DOTALL)
+
+class BufferedSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver that holds checkpoint writes in memory and commits them together
+    Each workflow run produces one checkpoint per node; flush() writes them all in a single transaction
+    """
+    
+    def __init__(self, conn: sqlite3.Connection, **kwargs):
+        super().__init__(conn, **kwargs)
+        self.pending_writes = deque()
+    
+    def put(self, config: Dict[str, Any], checkpoint: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Serialize the checkpoint now and queue it for the next flush"""
+        row = (
+            str(config["configurable"]["thread_id"]),
+            checkpoint["id"],
+            config["configurable"].get("thread_ts"),
+            self.serde.dumps(checkpoint),
+            self.serde.dumps(metadata)
+        )
+        with self.lock:
+            self.pending_writes.append(row)
+        
+        return {
+            "configurable": {
+                "thread_id": config["configurable"]["thread_id"],
+                "thread_ts": checkpoint["id"]
+            }
+        }
+    
+    def flush(self):
+        """Write all queued checkpoints in one transaction"""
+        with self.lock:
+            if not self.pending_writes:
+                return
+            with self.cursor() as cur:
+                cur.executemany(
+                    "INSERT OR REPLACE INTO checkpoints (thread_id, thread_ts, parent_ts, checkpoint, metadata) VALUES (?, ?, ?, ?, ?)",
+                    self.pending_writes
+                )
+            self.pending_writes.clear()
+    
+    def get_tuple(self, config: Dict[str, Any]):
+        self.flush()
+        return super().get_tuple(config)
+    
+    def list(self, config: Dict[str, Any], **kwargs):
+        self.flush()
+        return super().list(config, **kwargs)
+    
+    def search(self, metadata_filter: Dict[str, Any], **kwargs):
+        self.flush()
+        return super().search(metadata_filter, **kwargs)
+
+# Checkpoint savers shared per database file, so every manager reuses one tuned connection
+_checkpoint_savers: Dict[str, SqliteSaver] = {}
+_checkpoint_savers_lock = threading.Lock()
+
+def get_checkpoint_saver(db_path: str) -> SqliteSaver:
+    """Return the shared SqliteSaver for a checkpoint database file, opening it on first use"""
+    with _checkpoint_savers_lock:
+        saver = _checkpoint_savers.get(db_path)
+        if saver is None:
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                PRAGMA temp_store=MEMORY;
+                PRAGMA mmap_size=268435456;
+                PRAGMA cache_size=-65536;
+            """)
+            saver = _checkpoint_savers[db_path] = BufferedSqliteSaver(conn)
+        return saver
+
 class HealthcareStateManager:
     """
     State Management System for Healthcare Research Assistant
     Manages state transitions and memory updates using LangGraph StateGraph
     """
     
-    def __init__(self, memory_saver: SqliteSaver = None):
-        self.memory_saver = memory_saver or SqliteSaver.from_conn_string(":memory:")
-        self.graph = self._build_graph()
+    # Keyword patterns compiled once and shared by all instances
+    GREETING_PATTERN = _compile_terms(["hello", "hi", "hey", "good morning", "good afternoon"])
+    VAGUE_PATTERN = _compile_terms(["help", "what can you do", "how are you"])
+    MEDICAL_PATTERN = _compile_terms([
+        "treatment", "therapy", "drug", "medication", "clinical", "trial",
+        "disease", "diagnosis", "patient", "efficacy", "side effects",
+        "literature", "research", "study", "pubmed", "journal"
+    ])
+    
+    # Categorization patterns; earlier categories take precedence
+    QUERY_TYPE_PATTERN = _compile_categories([
+        ("treatment_comparison", ["compare", "versus", "vs", "difference"]),
+        ("literature_search", ["literature", "research", "studies", "papers"])
+    ])
+    PRIORITY_PATTERN = _compile_categories([
+        ("critical", ["urgent", "critical", "emergency"]),
+        ("high", ["important", "priority"])
+    ])
+    
+    # Word tokens for term matching; punctuation is not part of a term
+    WORD_PATTERN = re.compile(r"\w+")
+    
+    # Priorities whose responses go to human approval
+    APPROVAL_PRIORITIES = frozenset({"high", "critical"})
+    
+    # Node order of the workflow; _build_graph chains its edges in this order
+    WORKFLOW_SEQUENCE = (
+        "filter_input", "process_query", "retrieve_memory", "generate_response",
+        "human_approval", "update_memory", "trim_memory"
+    )
+    
+    # Sessions whose retrieval indexes are kept; evicted sessions rebuild on their next query
+    MEMORY_INDEX_SESSIONS = 32
+    
+    # Compiled workflows keyed by manager class
+    _compiled_graphs: Dict[type, Any] = {}
+    
+    def __init__(self, memory_saver: SqliteSaver = None, db_path: str = ":memory:"):
+        if memory_saver is None:
+            # In-memory checkpoints stay private to this manager; file databases are shared
+            if db_path == ":memory:":
+                memory_saver = BufferedSqliteSaver(sqlite3.connect(db_path, check_same_thread=False))
+            else:
+                memory_saver = get_checkpoint_saver(db_path)
+        self.memory_saver = memory_saver
+        # Retrieval indexes are derived from state, so they live here rather than in checkpoints
+        self._memory_indexes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # The shared graph finds the manager to run its nodes on in the config bound here
+        self.graph = self._compiled_graph().copy(update={"checkpointer": memory_saver}).with_config(
+            configurable={"state_manager": self}
+        )
+    
+    @classmethod
+    def _compiled_graph(cls) -> StateGraph:
+        """Compile the workflow once per manager class; instances attach their own checkpointer"""
+        graph = cls._compiled_graphs.get(cls)
+        if graph is None:
+            graph = cls._compiled_graphs[cls] = cls._build_graph()
+        return graph
+    
+    @staticmethod
+    def _bind_node(method_name: str) -> Callable[[HealthcareAgentState, Dict[str, Any]], HealthcareAgentState]:
+        """Wrap a node method so the shared graph runs it on the manager named in the run config"""
+        def run_node(state: HealthcareAgentState, config: Dict[str, Any]) -> HealthcareAgentState:
+            return getattr(config["configurable"]["state_manager"], method_name)(state)
+        run_node.__name__ = method_name
+        return run_node
     
-    def _build_graph(self) -> StateGraph:
+    @classmethod
+    def _build_graph(cls) -> StateGraph:
         """Build the StateGraph for healthcare research workflow"""
         workflow = StateGraph(HealthcareAgentState)
         
         # Add nodes for different states
-        workflow.add_node("process_query", self.process_query_node)
-        workflow.add_node("retrieve_memory", self.retrieve_memory_node)
-        workflow.add_node("generate_response", self.generate_response_node)
-        workflow.add_node("update_memory", self.update_memory_node)
-        workflow.add_node("trim_memory", self.trim_memory_node)
-        workflow.add_node("human_approval", self.human_approval_node)
-        workflow.add_node("filter_input", self.filter_input_node)
+        workflow.add_node("process_query", cls._bind_node("process_query_node"))
+        workflow.add_node("retrieve_memory", cls._bind_node("retrieve_memory_node"))
+        workflow.add_node("generate_response", cls._bind_node("generate_response_node"))
+        workflow.add_node("update_memory", cls._bind_node("update_memory_node"))
+        workflow.add_node("trim_memory", cls._bind_node("trim_memory_node"))
+        workflow.add_node("human_approval", cls._bind_node("human_approval_node"))
+        workflow.add_node("filter_input", cls._bind_node("filter_input_node"))
         
         # Define the workflow flow
-        workflow.set_entry_point("filter_input")
+        workflow.set_entry_point(cls.WORKFLOW_SEQUENCE[0])
         
-        workflow.add_edge("filter_input", "process_query")
-        workflow.add_edge("process_query", "retrieve_memory")
-        workflow.add_edge("retrieve_memory", "generate_response")
-        workflow.add_edge("generate_response", "human_approval")
-        workflow.add_edge("human_approval", "update_memory")
-        workflow.add_edge("update_memory", "trim_memory")
-        workflow.add_edge("trim_memory", END)
+        for source, target in zip(cls.WORKFLOW_SEQUENCE, cls.WORKFLOW_SEQUENCE[1:]):
+            workflow.add_edge(source, target)
+        workflow.add_edge(cls.WORKFLOW_SEQUENCE[-1], END)
         
-        return workflow.compile(checkpointer=self.memory_saver)
+        return workflow.compile()
     
     def filter_input_node(self, state: HealthcareAgentState) -> HealthcareAgentState:
         """Filter out non-informational inputs and validate queries"""
@@ -54,7 +204,7 @@ class HealthcareStateManager:
         
         filtered_queries = []
         for query in state["current_queries"]:
-            query_text = query.get("query_text", "").lower().strip()
+            query_text = self._prepare_query_text(query)
             
             # Filter out greetings and vague queries
             if self._is_informational_query(query_text):
@@ -63,58 +213,103 @@ class HealthcareStateManager:
         state["current_queries"] = filtered_queries
         return state
     
+    def _prepare_query_text(self, query: Dict[str, Any]) -> str:
+        """Lowercase a query once, caching the text on the query"""
+        query_text = query.get("_text_lc")
+        if query_text is None:
+            query_text = query["_text_lc"] = query.get("query_text", "").lower().strip()
+        return query_text
+    
+    def _summary_tokens(self, summary: Dict[str, Any]) -> Set[str]:
+        """Word tokens of a summary's lead key finding; the findings index keeps them, not the summary"""
+        key_findings = summary.get("key_findings")
+        return set(self.WORD_PATTERN.findall(key_findings[0].lower())) if key_findings else set()
+    
+    def _session_indexes(self, session_id: str) -> Dict[str, Any]:
+        """Return the retrieval indexes kept for a session, evicting the least recently used session"""
+        indexes = self._memory_indexes.get(session_id)
+        if indexes is None:
+            indexes = self._memory_indexes[session_id] = {}
+            if len(self._memory_indexes) > self.MEMORY_INDEX_SESSIONS:
+                self._memory_indexes.popitem(last=False)
+        else:
+            self._memory_indexes.move_to_end(session_id)
+        return indexes
+    
+    def _update_index(
+        self, 
+        index: Dict[str, Any], 
+        entries: List[Dict[str, Any]], 
+        key_field: str,
+        term_fns: Dict[str, Callable[[Dict[str, Any]], Iterable[str]]]
+    ) -> Dict[str, Any]:
+        """Index entries appended since the last update, rebuilding if indexed entries were removed or replaced"""
+        # Memory lists only grow by appending, so spot-checking the first and last indexed ids keeps this O(1)
+        keys = index["keys"] if index else None
+        if (not index or len(keys) > len(entries)
+                or (keys and (entries[0].get(key_field) != keys[0]
+                              or entries[len(keys) - 1].get(key_field) != keys[-1]))):
+            index = {"keys": [], **{name: {} for name in term_fns}}
+        
+        for position in range(len(index["keys"]), len(entries)):
+            entry = entries[position]
+            index["keys"].append(entry.get(key_field))
+            for name, term_fn in term_fns.items():
+                for term in set(term_fn(entry)):
+                    index[name].setdefault(term, []).append(position)
+        
+        return index
+    
+    def _match_substring(self, postings: Dict[str, List[int]], text: str) -> Set[int]:
+        """Return positions indexed under any key containing text; each distinct key is tested once"""
+        return {position for key, hits in postings.items() if text in key for position in hits}
+    
+    def _match_prefix(self, keys: List[str], postings: Dict[str, List[int]], prefix: str) -> Set[int]:
+        """Return positions indexed under any key starting with prefix; keys is the sorted list of postings keys"""
+        positions = set()
+        for i in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            positions.update(postings[keys[i]])
+        return positions
+    
     def _is_informational_query(self, query_text: str) -> bool:
         """Check if query is informational and relevant for medical research"""
-        greetings = ["hello", "hi", "hey", "good morning", "good afternoon"]
-        vague_terms = ["help", "what can you do", "how are you"]
-        
         # Filter out greetings
-        if any(greeting in query_text for greeting in greetings):
+        if self.GREETING_PATTERN.search(query_text):
             return False
         
         # Filter out vague queries
-        if any(vague in query_text for vague in vague_terms):
+        if self.VAGUE_PATTERN.search(query_text):
             return False
         
         # Check for medical/research keywords
-        medical_keywords = [
-            "treatment", "therapy", "drug", "medication", "clinical", "trial",
-            "disease", "diagnosis", "patient", "efficacy", "side effects",
-            "literature", "research", "study", "pubmed", "journal"
-        ]
-        
-        return any(keyword in query_text for keyword in medical_keywords)
+        return self.MEDICAL_PATTERN.search(query_text) is not None
     
     def process_query_node(self, state: HealthcareAgentState) -> HealthcareAgentState:
         """Process incoming queries and categorize them"""
         if not state["current_queries"]:
             return state
         
-        processed_queries = []
-        for query in state["current_queries"]:
-            query_text = query["query_text"].lower()
+        queries = state["current_queries"]
+        match_type = self.QUERY_TYPE_PATTERN.match
+        match_priority = self.PRIORITY_PATTERN.match
+        prepare_query_text = self._prepare_query_text
+        
+        for query in queries:
+            query_text = prepare_query_text(query)
             
             # Categorize query type
-            if any(term in query_text for term in ["compare", "versus", "vs", "difference"]):
-                query["query_type"] = "treatment_comparison"
-            elif any(term in query_text for term in ["literature", "research", "studies", "papers"]):
-                query["query_type"] = "literature_search"
-            else:
-                query["query_type"] = "clinical_question"
+            match = match_type(query_text)
+            query["query_type"] = match.lastgroup if match else "clinical_question"
             
             # Set priority based on urgency keywords
-            if any(term in query_text for term in ["urgent", "critical", "emergency"]):
-                query["priority"] = "critical"
-            elif any(term in query_text for term in ["important", "priority"]):
-                query["priority"] = "high"
-            else:
-                query["priority"] = "medium"
+            match = match_priority(query_text)
+            query["priority"] = match.lastgroup if match else "medium"
             
             query["status"] = "processing"
-            processed_queries.append(query)
         
-        state["current_queries"] = processed_queries
-        state["message_count"] += len(processed_queries)
+        state["message_count"] += len(queries)
         return state
     
     def retrieve_memory_node(self, state: HealthcareAgentState) -> HealthcareAgentState:
@@ -125,23 +320,51 @@ class HealthcareStateManager:
         relevant_summaries = []
         relevant_comparisons = []
         
-        for query in state["current_queries"]:
-            query_text = query["query_text"].lower()
-            disease_focus = state["disease_focus"].lower()
+        # Bring the session's inverted indexes up to date with any newly stored memory
+        summaries = state["literature_summaries"]
+        comparisons = state["comparative_findings"]
+        indexes = self._session_indexes(state["session_id"])
+        summary_index = indexes["summaries"] = self._update_index(indexes.get("summaries"), summaries, "summary_id", {
+            "focus": lambda summary: (summary["treatment_focus"].lower(),),
+            "findings": self._summary_tokens
+        })
+        comparison_index = indexes["comparisons"] = self._update_index(indexes.get("comparisons"), comparisons, "comparison_id", {
+            "conditions": lambda comparison: (comparison["disease_condition"].lower(),),
+            "treatments": lambda comparison: {treatment.lower() for treatment in comparison["treatments"]}
+        })
+        
+        # Findings tokens only grow within an index, so a changed count means new tokens to sort in
+        finding_tokens = summary_index.get("finding_tokens")
+        if finding_tokens is None or len(finding_tokens) != len(summary_index["findings"]):
+            finding_tokens = summary_index["finding_tokens"] = sorted(summary_index["findings"])
+        
+        # Disease focus matches are the same for every query
+        disease_focus = state["disease_focus"].lower()
+        disease_summaries = self._match_substring(summary_index["focus"], disease_focus)
+        disease_comparisons = self._match_substring(comparison_index["conditions"], disease_focus)
+        
+        def retrieve_one(query: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+            """Retrieve one query's summaries and comparisons; independent of the other queries"""
+            query_text = self._prepare_query_text(query)
             
             # Retrieve relevant literature summaries
-            for summary in state["literature_summaries"]:
-                if (disease_focus in summary["treatment_focus"].lower() or 
-                    any(term in summary["key_findings"][0].lower() 
-                        for term in query_text.split() if len(term) > 3)):
-                    relevant_summaries.append(summary)
+            positions = set(disease_summaries)
+            # A query term matches findings words it begins, so "statin" still finds "statins"
+            for term in {term for term in self.WORD_PATTERN.findall(query_text) if len(term) > 3}:
+                positions.update(self._match_prefix(finding_tokens, summary_index["findings"], term))
+            query_summaries = [summaries[i] for i in sorted(positions)]
             
             # Retrieve relevant comparative findings
-            for comparison in state["comparative_findings"]:
-                if (disease_focus in comparison["disease_condition"].lower() or
-                    any(treatment.lower() in query_text 
-                        for treatment in comparison["treatments"])):
-                    relevant_comparisons.append(comparison)
+            positions = set(disease_comparisons)
+            for treatment, hits in comparison_index["treatments"].items():
+                if treatment in query_text:
+                    positions.update(hits)
+            return query_summaries, [comparisons[i] for i in sorted(positions)]
+        
+        # Lookups are in-memory today; swap map for an executor's map once they reach a DB or API
+        for query_summaries, query_comparisons in map(retrieve_one, state["current_queries"]):
+            relevant_summaries.extend(query_summaries)
+            relevant_comparisons.extend(query_comparisons)
         
         # Add retrieved information to session responses for context
         if relevant_summaries or relevant_comparisons:
@@ -160,6 +383,8 @@ class HealthcareStateManager:
         if not state["current_queries"]:
             return state
         
+        # Responses generated in one pass share a timestamp
+        timestamp = datetime.now().isoformat()
         responses = []
         for query in state["current_queries"]:
             response = {
@@ -167,30 +392,39 @@ class HealthcareStateManager:
                 "response_type": query["query_type"],
                 "generated_content": f"Generated response for {query['query_type']}: {query['query_text']}",
                 "confidence_score": 0.85,
-                "requires_approval": query["priority"] in ["high", "critical"],
-                "timestamp": datetime.now().isoformat()
+                "requires_approval": query["priority"] in self.APPROVAL_PRIORITIES,
+                "timestamp": timestamp
             }
             responses.append(response)
         
+        # Only these new responses can need approval
+        state["last_approved_idx"] = len(state["session_responses"])
         state["session_responses"].extend(responses)
         return state
     
     def human_approval_node(self, state: HealthcareAgentState) -> HealthcareAgentState:
         """Handle human-in-the-loop approval for critical responses"""
-        pending_approvals = []
+        # Approval ids already queued; derived here so the state only holds JSON-friendly lists
+        approval_ids = {approval.get("approval_id") for approval in state["pending_approvals"]}
         
-        for response in state["session_responses"]:
+        timestamp = datetime.now().isoformat()
+        pending_approvals = []
+        for response in state["session_responses"][state.get("last_approved_idx", 0):]:
             if response.get("requires_approval", False):
-                approval_request = {
-                    "approval_id": f"approval_{response.get('query_id', 'unknown')}",
+                approval_id = f"approval_{response.get('query_id', 'unknown')}"
+                if approval_id in approval_ids:
+                    continue
+                approval_ids.add(approval_id)
+                pending_approvals.append({
+                    "approval_id": approval_id,
                     "content": response["generated_content"],
                     "type": response["response_type"],
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": timestamp,
                     "status": "pending_approval"
-                }
-                pending_approvals.append(approval_request)
+                })
         
         state["pending_approvals"].extend(pending_approvals)
+        state["last_approved_idx"] = len(state["session_responses"])
         return state
     
     def update_memory_node(self, state: HealthcareAgentState) -> HealthcareAgentState:
@@ -205,16 +439,20 @@ class HealthcareStateManager:
             "session_id": state["session_id"]
         }
         
-        # Check if project already exists, update or add
-        project_exists = False
-        for i, project in enumerate(state["research_projects"]):
-            if project["project_id"] == state["project_id"]:
-                state["research_projects"][i] = current_project
-                project_exists = True
-                break
-        
-        if not project_exists:
-            state["research_projects"].append(current_project)
+        # Check if project already exists through the id index, update or add
+        projects = state["research_projects"]
+        indexes = self._session_indexes(state["session_id"])
+        project_terms = {"ids": lambda project: (project["project_id"],)}
+        project_index = indexes["projects"] = self._update_index(indexes.get("projects"), projects, "project_id", project_terms)
+        positions = project_index["ids"].get(state["project_id"])
+        if positions and projects[positions[0]]["project_id"] != state["project_id"]:
+            # The project moved since it was indexed; reindex the list once
+            project_index = indexes["projects"] = self._update_index(None, projects, "project_id", project_terms)
+            positions = project_index["ids"].get(state["project_id"])
+        if positions:
+            projects[positions[0]] = current_project
+        else:
+            projects.append(current_project)
         
         # Clear current queries after processing
         state["current_queries"] = []
@@ -226,14 +464,16 @@ class HealthcareStateManager:
         max_session_responses = 7
         max_active_conversation = 10
         
-        # Trim session responses
-        if len(state["session_responses"]) > max_session_responses:
-            state["session_responses"] = state["session_responses"][-max_session_responses:]
+        # Trim in place; dropping the oldest entries avoids copying the retained ones into a new list
+        session_responses = state["session_responses"]
+        if len(session_responses) > max_session_responses:
+            del session_responses[:-max_session_responses]
+            state["last_approved_idx"] = max_session_responses
             state["memory_trimmed"] = True
         
-        # Trim active conversation
-        if len(state["active_conversation"]) > max_active_conversation:
-            state["active_conversation"] = state["active_conversation"][-max_active_conversation:]
+        active_conversation = state["active_conversation"]
+        if len(active_conversation) > max_active_conversation:
+            del active_conversation[:-max_active_conversation]
             state["memory_trimmed"] = True
         
         return state
@@ -250,8 +490,8 @@ class HealthcareStateManager:
         # Update timestamp
         current_state["timestamp"] = datetime.now().isoformat()
         
-        # Validate state after update
-        if not validate_state(current_state):
+        # Validate the fields this update touched; untouched fields were valid before
+        if not validate_state_delta(current_state, {*update, "timestamp"}):
             raise ValueError("Invalid state after update")
         
         return current_state
@@ -265,5 +505,17 @@ class HealthcareStateManager:
     def process_state_update(self, state: HealthcareAgentState) -> HealthcareAgentState:
         """Process a complete state update through the workflow"""
         thread_config = {"configurable": {"thread_id": state["session_id"]}}
-        result = self.graph.invoke(state, thread_config)
+        try:
+            if len(state["current_queries"]) == 1:
+                # A single query runs the nodes directly and checkpoints only the finished state
+                for node in self.WORKFLOW_SEQUENCE:
+                    state = getattr(self, f"{node}_node")(state)
+                self.graph.update_state(thread_config, state, as_node=self.WORKFLOW_SEQUENCE[-1])
+                result = state
+            else:
+                result = self.graph.invoke(state, thread_config)
+        finally:
+            # Commit the run's checkpoints together once the workflow has finished
+            if isinstance(self.memory_saver, BufferedSqliteSaver):
+                self.memory_saver.flush()
         return result
\ No newline at end of file
@@ -5,8 +5,14 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import json
 import io
+import copy
 import os
-from typing import Dict, List, Any
+import hashlib
+import types
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, List, Any, TextIO
 
 from healthcare_schema import (
     HealthcareAgentState, 
@@ -17,7 +23,130 @@ from state_management import HealthcareStateManager
 from memory_manager import HealthcareMemoryManager
 from medical_query_handler import MedicalQueryHandler
 from message_filter import MessageFilter
-from config import get_config
+from config import get_config, get_logger
+
+logger = get_logger(__name__)
+
+# Service objects are built once per server process and shared across reruns and sessions
+@st.cache_resource
+def _get_memory_manager() -> HealthcareMemoryManager:
+    """Get the shared long-term memory manager"""
+    return HealthcareMemoryManager()
+
+@st.cache_resource
+def _build_query_handler(api_key: str) -> MedicalQueryHandler:
+    """Build the query handler for an API key once"""
+    logger.debug("Creating MedicalQueryHandler with API key: %s...", api_key[:10] if api_key else 'None')
+    query_handler = MedicalQueryHandler(api_key)
+    logger.debug("Query handler created. use_direct_genai: %s", getattr(query_handler, 'use_direct_genai', 'Not set'))
+    return query_handler
+
+def _get_query_handler(api_key: str) -> MedicalQueryHandler:
+    """Get the cached query handler for an API key and configure genai with that key"""
+    # genai.configure is process-wide and models bind the global client on first call,
+    # so reconfigure whenever a cached handler is handed out, as constructing one used to
+    query_handler = _build_query_handler(api_key)
+    query_handler.activate()
+    return query_handler
+
+class _FailedQueryResponse(Exception):
+    """Raised from the cached query call so st.cache_data does not keep a response built from an LLM error"""
+    
+    def __init__(self, response: Dict[str, Any]):
+        super().__init__("LLM call failed while processing the query")
+        self.response = response
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_process_query(
+    api_key_fingerprint: str, 
+    query_text: str, 
+    query_type: str, 
+    priority: str, 
+    _query_handler: MedicalQueryHandler
+) -> Dict[str, Any]:
+    """Process a query through the handler, reusing the response for repeats of the same query"""
+    # The leading underscore keeps the handler out of the cache key; the key fingerprint stands in for it
+    failures = _query_handler.generation_failures
+    response = _query_handler.process_medical_query(create_query(query_text, query_type, priority))
+    # A transient API error would otherwise be served for every repeat of the query until the TTL expires
+    if _query_handler.generation_failures != failures:
+        raise _FailedQueryResponse(response)
+    return response
+
+def _api_key_fingerprint(api_key: str) -> str:
+    """Hash an API key so cache keys never hold the secret itself"""
+    return hashlib.sha256(api_key.encode()).hexdigest() if api_key else ""
+
+@st.cache_resource
+def _get_message_filter() -> MessageFilter:
+    """Get the shared message filter"""
+    return MessageFilter()
+
+@st.cache_resource
+def _get_save_executor() -> ThreadPoolExecutor:
+    """Get the shared executor that writes sessions to long-term memory in the background"""
+    return ThreadPoolExecutor(max_workers=2)
+
+@st.cache_resource
+def _get_state_manager() -> HealthcareStateManager:
+    """Get the shared workflow state manager"""
+    return HealthcareStateManager()
+
+# Icons shown next to each response type
+_RESPONSE_ICONS = types.MappingProxyType({
+    'literature_search': '📚',
+    'treatment_comparison': '⚖️',
+    'clinical_question': '🩺',
+    'general_medical': '💊'
+})
+
+# Page styles, injected on every rerun since Streamlit drops elements a rerun does not emit
+_CUSTOM_CSS = """
+<style>
+.main-header {
+    background: linear-gradient(90deg, #1e3c72 0%, #2a5298 100%);
+    padding: 1rem;
+    border-radius: 10px;
+    color: white;
+    margin-bottom: 2rem;
+}
+.query-box {
+    background-color: #f0f2f6;
+    padding: 1rem;
+    border-radius: 10px;
+    border-left: 4px solid #1e3c72;
+    margin: 1rem 0;
+}
+.response-box {
+    background-color: #e8f4fd;
+    padding: 1rem;
+    border-radius: 10px;
+    border-left: 4px solid #2a5298;
+    margin: 1rem 0;
+}
+.approval-needed {
+    background-color: #fff3cd;
+    border-left: 4px solid #ffc107;
+    padding: 1rem;
+    border-radius: 10px;
+    margin: 1rem 0;
+}
+.success-box {
+    background-color: #d4edda;
+    border-left: 4px solid #28a745;
+    padding: 1rem;
+    border-radius: 10px;
+    margin: 1rem 0;
+}
+.error-box {
+    background-color: #f8d7da;
+    border-left: 4px solid #dc3545;
+    padding: 1rem;
+    border-radius: 10px;
+    margin: 1rem 0;
+}
+</style>
+"""
 
 class HealthcareResearchUI:
     """Streamlit UI for Healthcare Research Assistant"""
@@ -25,12 +154,10 @@ class HealthcareResearchUI:
     def __init__(self):
         self.init_session_state()
         self.config = get_config()
-        self.memory_manager = HealthcareMemoryManager()
-        print(f"Streamlit: Creating MedicalQueryHandler with API key: {self.config.GOOGLE_API_KEY[:10] if self.config.GOOGLE_API_KEY else 'None'}...")
-        self.query_handler = MedicalQueryHandler(self.config.GOOGLE_API_KEY)
-        print(f"Streamlit: Query handler created. use_direct_genai: {getattr(self.query_handler, 'use_direct_genai', 'Not set')}")
-        self.message_filter = MessageFilter()
-        self.state_manager = HealthcareStateManager()
+        self.memory_manager = _get_memory_manager()
+        self.query_handler = _get_query_handler(self.config.GOOGLE_API_KEY)
+        self.message_filter = _get_message_filter()
+        self.state_manager = _get_state_manager()
     
     def init_session_state(self):
         """Initialize Streamlit session state"""
@@ -46,6 +173,10 @@ class HealthcareResearchUI:
             st.session_state.query_history = []
         if 'pending_approvals' not in st.session_state:
             st.session_state.pending_approvals = []
+        if 'save_futures' not in st.session_state:
+            st.session_state.save_futures = []
+        if 'analytics_cache' not in st.session_state:
+            st.session_state.analytics_cache = {'len': 0, 'df': None, 'type_counts': Counter(), 'figures': None}
     
     def run(self):
         """Run the Streamlit application"""
@@ -72,54 +203,10 @@ class HealthcareResearchUI:
         else:
             self.render_main_interface()
     
-    def get_custom_css(self) -> str:
+    @staticmethod
+    def get_custom_css() -> str:
         """Custom CSS for the application"""
-        return """
-        <style>
-        .main-header {
-            background: linear-gradient(90deg, #1e3c72 0%, #2a5298 100%);
-            padding: 1rem;
-            border-radius: 10px;
-            color: white;
-            margin-bottom: 2rem;
-        }
-        .query-box {
-            background-color: #f0f2f6;
-            padding: 1rem;
-            border-radius: 10px;
-            border-left: 4px solid #1e3c72;
-            margin: 1rem 0;
-        }
-        .response-box {
-            background-color: #e8f4fd;
-            padding: 1rem;
-            border-radius: 10px;
-            border-left: 4px solid #2a5298;
-            margin: 1rem 0;
-        }
-        .approval-needed {
-            background-color: #fff3cd;
-            border-left: 4px solid #ffc107;
-            padding: 1rem;
-            border-radius: 10px;
-            margin: 1rem 0;
-        }
-        .success-box {
-            background-color: #d4edda;
-            border-left: 4px solid #28a745;
-            padding: 1rem;
-            border-radius: 10px;
-            margin: 1rem 0;
-        }
-        .error-box {
-            background-color: #f8d7da;
-            border-left: 4px solid #dc3545;
-            padding: 1rem;
-            border-radius: 10px;
-            margin: 1rem 0;
-        }
-        </style>
-        """
+        return _CUSTOM_CSS
     
     def render_sidebar(self):
         """Render the sidebar with session management and settings"""
@@ -154,10 +241,13 @@ class HealthcareResearchUI:
             """)
             
             if st.sidebar.button("💾 Save Session"):
-                if self.memory_manager.save_session(state):
-                    st.sidebar.success("✅ Session saved!")
-                else:
-                    st.sidebar.error("❌ Failed to save session")
+                # Save a snapshot off the script thread; later queries keep mutating the live state
+                st.session_state.save_futures.append(
+                    _get_save_executor().submit(self.memory_manager.save_session, copy.deepcopy(state))
+                )
+                st.sidebar.info("💾 Saving session...")
+            
+            self.report_finished_saves()
         
         # Settings
         with st.sidebar.expander("⚙️ Settings", expanded=False):
@@ -168,8 +258,23 @@ class HealthcareResearchUI:
             api_key_input = st.text_input("Google API Key", type="password", help="Enter your Google Gemini API key")
             
             if api_key_input:
-                os.environ['GOOGLE_API_KEY'] = api_key_input
-                self.query_handler = MedicalQueryHandler(api_key_input)
+                # Export the key only when it changes; the handler for it is built once and cached
+                if api_key_input != st.session_state.get('api_key_in_use'):
+                    os.environ['GOOGLE_API_KEY'] = api_key_input
+                    st.session_state.api_key_in_use = api_key_input
+                self.query_handler = _get_query_handler(api_key_input)
+    
+    def report_finished_saves(self):
+        """Report background session saves that have completed since the last rerun"""
+        pending_saves = []
+        for future in st.session_state.save_futures:
+            if not future.done():
+                pending_saves.append(future)
+            elif future.result():
+                st.toast("✅ Session saved!")
+            else:
+                st.toast("❌ Failed to save session")
+        st.session_state.save_futures = pending_saves
     
     def render_welcome_page(self):
         """Render the welcome page"""
@@ -257,7 +362,7 @@ class HealthcareResearchUI:
         # Display recent queries
         if st.session_state.query_history:
             st.subheader("🕒 Recent Queries")
-            for i, query_info in enumerate(reversed(st.session_state.query_history[-5:])):
+            for i, query_info in enumerate(islice(reversed(st.session_state.query_history), 5)):
                 with st.expander(f"Query {len(st.session_state.query_history) - i}: {query_info['query_text'][:60]}..."):
                     st.write(f"**Type:** {query_info['query_type']}")
                     st.write(f"**Priority:** {query_info['priority']}")
@@ -267,18 +372,15 @@ class HealthcareResearchUI:
     def process_new_query(self, query_text: str, query_type: str, priority: str):
         """Process a new query through the system"""
         try:
-            # Create new query
-            new_query = create_query(query_text, query_type, priority)
-            
-            # Filter the query
+            # Filter the query before building it, so rejected input creates nothing
             is_valid, cleaned_text, filter_info = self.message_filter.filter_query(query_text)
             
             if not is_valid:
                 st.error(f"❌ Query filtered out: {filter_info['reason']}")
                 return
             
-            # Update query with cleaned text
-            new_query['query_text'] = cleaned_text
+            # Create new query from the cleaned text
+            new_query = create_query(cleaned_text, query_type, priority)
             
             # Add to state
             state = st.session_state.healthcare_state
@@ -288,8 +390,17 @@ class HealthcareResearchUI:
             with st.spinner("🔄 Processing your query..."):
                 st.info("Query submitted successfully! Processing in progress...")
                 
-                # Process query
-                response = self.query_handler.process_medical_query(new_query)
+                # Process query; a cached response is re-tagged for this query
+                try:
+                    response = _cached_process_query(
+                        _api_key_fingerprint(self.query_handler.api_key),
+                        new_query['query_text'], query_type, priority, self.query_handler
+                    )
+                except _FailedQueryResponse as e:
+                    response = e.response
+                # One timestamp for the response, its approval request and its history entry
+                timestamp = datetime.now().isoformat()
+                response.update(query_id=new_query['query_id'], timestamp=timestamp)
             
             # Add to session responses
             state['session_responses'].append(response)
@@ -300,7 +411,7 @@ class HealthcareResearchUI:
                     'query_id': new_query['query_id'],
                     'query_text': query_text,
                     'response': response,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': timestamp
                 })
                 st.warning("⚠️ This response requires approval. Check the Approvals tab.")
             
@@ -310,7 +421,7 @@ class HealthcareResearchUI:
                 'query_text': query_text,
                 'query_type': query_type,
                 'priority': priority,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 'status': 'completed' if not response.get('requires_approval') else 'pending_approval'
             })
             
@@ -343,7 +454,7 @@ class HealthcareResearchUI:
             return
         
         # Display recent responses
-        for response in reversed(state['session_responses'][-10:]):
+        for response in islice(reversed(state['session_responses']), 10):
             response_type = response.get('response_type', 'unknown')
             
             with st.expander(f"{self.get_response_icon(response_type)} {response_type.replace('_', ' ').title()}", expanded=True):
@@ -362,48 +473,51 @@ class HealthcareResearchUI:
     
     def get_response_icon(self, response_type: str) -> str:
         """Get icon for response type"""
-        icons = {
-            'literature_search': '📚',
-            'treatment_comparison': '⚖️',
-            'clinical_question': '🩺',
-            'general_medical': '💊'
-        }
-        return icons.get(response_type, '🔍')
+        return _RESPONSE_ICONS.get(response_type, '🔍')
     
     def render_literature_response(self, response: Dict[str, Any]):
         """Render literature search response"""
-        st.markdown(f"**Search Terms:** {', '.join(response.get('search_terms', []))}")
-        st.markdown(f"**Articles Found:** {response.get('articles_found', 0)}")
+        st.markdown(
+            f"**Search Terms:** {', '.join(response.get('search_terms', []))}\n\n"
+            f"**Articles Found:** {response.get('articles_found', 0)}"
+        )
         
+        # One markdown element per article rather than one per line
         summaries = response.get('summaries', [])
-        if summaries:
-            for i, summary in enumerate(summaries):
-                st.markdown(f"### 📄 Article {i+1}: {summary['title']}")
-                st.markdown(f"**Authors:** {', '.join(summary['authors'])}")
-                st.markdown(f"**Journal:** {summary['journal']}")
-                st.markdown(f"**Key Findings:**")
-                for finding in summary['key_findings']:
-                    st.markdown(f"- {finding}")
+        for i, summary in enumerate(summaries):
+            findings = "\n".join(f"- {finding}" for finding in summary['key_findings'])
+            st.markdown(
+                f"### 📄 Article {i+1}: {summary['title']}\n\n"
+                f"**Authors:** {', '.join(summary['authors'])}\n\n"
+                f"**Journal:** {summary['journal']}\n\n"
+                f"**Key Findings:**\n\n{findings}"
+            )
     
     def render_comparison_response(self, response: Dict[str, Any]):
         """Render treatment comparison response"""
         treatments = response.get('treatments_compared', [])
-        st.markdown(f"**Treatments Compared:** {', '.join(treatments)}")
+        parts = [f"**Treatments Compared:** {', '.join(treatments)}"]
         
         comparison_data = response.get('comparison_data', {})
         if comparison_data:
-            st.markdown("### 📊 Comparison Results")
+            parts.append("### 📊 Comparison Results")
             
-            # Create comparison table
+            # Create comparison table; a markdown table skips DataFrame and Arrow serialization for a few rows
             if 'efficacy_metrics' in comparison_data:
-                efficacy_df = pd.DataFrame([
-                    {'Treatment': treatment, 'Efficacy': comparison_data['efficacy_metrics'].get(treatment, 'N/A')}
+                efficacy = comparison_data['efficacy_metrics']
+                parts.append("| Treatment | Efficacy |\n| --- | --- |\n" + "\n".join(
+                    f"| {self._escape_table_cell(treatment)} | {self._escape_table_cell(efficacy.get(treatment, 'N/A'))} |"
                     for treatment in treatments
-                ])
-                st.dataframe(efficacy_df, use_container_width=True)
+                ))
             
             if 'recommendation' in comparison_data:
-                st.markdown(f"**Recommendation:** {comparison_data['recommendation']}")
+                parts.append(f"**Recommendation:** {comparison_data['recommendation']}")
+        
+        st.markdown("\n\n".join(parts))
+    
+    def _escape_table_cell(self, value: Any) -> str:
+        """Render a value as a single markdown table cell"""
+        return str(value).replace("|", "\\|").replace("\n", " ")
     
     def render_clinical_response(self, response: Dict[str, Any]):
         """Render clinical question response"""
@@ -456,10 +570,11 @@ class HealthcareResearchUI:
         
         # Add to approved summaries in state
         state = st.session_state.healthcare_state
+        now = datetime.now()
         state['approved_summaries'].append({
-            'approval_id': f"approved_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            'approval_id': f"approved_{now.strftime('%Y%m%d_%H%M%S')}",
             'query_id': approved_item['query_id'],
-            'approved_at': datetime.now().isoformat(),
+            'approved_at': now.isoformat(),
             'approved_by': state['researcher_id']
         })
         
@@ -472,11 +587,12 @@ class HealthcareResearchUI:
         
         # Add to flagged content
         state = st.session_state.healthcare_state
+        now = datetime.now()
         state['flagged_content'].append({
-            'flag_id': f"flagged_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            'flag_id': f"flagged_{now.strftime('%Y%m%d_%H%M%S')}",
             'query_id': rejected_item['query_id'],
             'reason': 'rejected_by_researcher',
-            'flagged_at': datetime.now().isoformat(),
+            'flagged_at': now.isoformat(),
             'flagged_by': state['researcher_id']
         })
         
@@ -514,23 +630,47 @@ class HealthcareResearchUI:
         with col4:
             st.metric("Session Responses", len(state.get('session_responses', [])))
         
+        if not st.session_state.query_history:
+            return
+        
+        analytics = self.get_analytics_data()
+        
+        # Figures are rebuilt only when queries arrived since they were last drawn
+        if analytics['figures'] is None:
+            type_names, type_values = zip(*analytics['type_counts'].most_common())
+            analytics['figures'] = (
+                px.pie(values=type_values, names=type_names, 
+                      title="Query Type Distribution"),
+                px.line(analytics['df'], x='timestamp', y=None, title="Query Timeline",
+                       hover_data=['query_type', 'priority'])
+            )
+        type_fig, timeline_fig = analytics['figures']
+        
         # Query type distribution
-        if st.session_state.query_history:
-            query_types = [q['query_type'] for q in st.session_state.query_history]
-            type_counts = pd.Series(query_types).value_counts()
-            
-            fig = px.pie(values=type_counts.values, names=type_counts.index, 
-                        title="Query Type Distribution")
-            st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(type_fig, use_container_width=True)
         
         # Timeline of queries
-        if st.session_state.query_history:
-            df = pd.DataFrame(st.session_state.query_history)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            
-            fig = px.line(df, x='timestamp', y=None, title="Query Timeline",
-                         hover_data=['query_type', 'priority'])
-            st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(timeline_fig, use_container_width=True)
+    
+    def get_analytics_data(self) -> Dict[str, Any]:
+        """Get the query history frame and type counts, extending them only with queries added since the last render"""
+        history = st.session_state.query_history
+        cache = st.session_state.analytics_cache
+        
+        # History only grows within a session; rebuild if it was replaced by something shorter
+        if cache['len'] > len(history):
+            cache.update(len=0, df=None, type_counts=Counter(), figures=None)
+        
+        if cache['len'] < len(history):
+            new_rows = history[cache['len']:]
+            new_df = pd.DataFrame(new_rows)
+            new_df['timestamp'] = pd.to_datetime(new_df['timestamp'])
+            cache['df'] = new_df if cache['df'] is None else pd.concat([cache['df'], new_df], ignore_index=True)
+            cache['type_counts'].update(row['query_type'] for row in new_rows)
+            cache['len'] = len(history)
+            cache['figures'] = None
+        
+        return cache
     
     def render_reports(self):
         """Render report generation interface"""
@@ -569,50 +709,60 @@ class HealthcareResearchUI:
     
     def generate_report(self, report_type: str, include_options: List[str]) -> str:
         """Generate research report"""
+        out = io.StringIO()
+        self.write_report(out, report_type, include_options)
+        return out.getvalue()
+    
+    def write_report(self, out: TextIO, report_type: str, include_options: List[str]):
+        """Write the research report to a text stream, one block at a time"""
         state = st.session_state.healthcare_state
-        report_lines = []
         
         # Header
-        report_lines.append(f"# MediSyn Labs Research Report")
-        report_lines.append(f"**Report Type:** {report_type}")
-        report_lines.append(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report_lines.append(f"**Session ID:** {state['session_id']}")
-        report_lines.append(f"**Researcher:** {state['researcher_id']}")
-        report_lines.append(f"**Project:** {state['project_id']}")
-        report_lines.append(f"**Disease Focus:** {state['disease_focus']}")
-        report_lines.append("")
-        
-        # Include selected sections
+        out.write(f"""# MediSyn Labs Research Report
+**Report Type:** {report_type}
+**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+**Session ID:** {state['session_id']}
+**Researcher:** {state['researcher_id']}
+**Project:** {state['project_id']}
+**Disease Focus:** {state['disease_focus']}
+""")
+        
+        # Include selected sections; every block after the header starts on a new line
         if "Query History" in include_options:
-            report_lines.append("## Query History")
-            for i, query in enumerate(st.session_state.query_history):
-                report_lines.append(f"### Query {i+1}")
-                report_lines.append(f"**Text:** {query['query_text']}")
-                report_lines.append(f"**Type:** {query['query_type']}")
-                report_lines.append(f"**Priority:** {query['priority']}")
-                report_lines.append(f"**Status:** {query['status']}")
-                report_lines.append("")
+            out.write("\n## Query History")
+            out.writelines(
+                f"\n### Query {i}\n"
+                f"**Text:** {query['query_text']}\n"
+                f"**Type:** {query['query_type']}\n"
+                f"**Priority:** {query['priority']}\n"
+                f"**Status:** {query['status']}\n"
+                for i, query in enumerate(st.session_state.query_history, 1)
+            )
         
         if "Research Results" in include_options:
-            report_lines.append("## Research Results")
-            for i, response in enumerate(state['session_responses']):
-                report_lines.append(f"### Result {i+1}")
-                report_lines.append(f"**Type:** {response.get('response_type', 'unknown')}")
-                report_lines.append(f"**Confidence:** {response.get('confidence_score', 0):.1%}")
-                if 'summaries' in response:
-                    report_lines.append("**Literature Summaries:**")
-                    for summary in response['summaries']:
-                        report_lines.append(f"- {summary['title']}")
-                report_lines.append("")
+            out.write("\n## Research Results")
+            for i, response in enumerate(state['session_responses'], 1):
+                out.write("\n")
+                out.write(self._format_report_result(i, response))
         
         if "Analytics" in include_options:
-            report_lines.append("## Analytics")
-            report_lines.append(f"**Total Queries:** {len(st.session_state.query_history)}")
-            report_lines.append(f"**Pending Approvals:** {len(st.session_state.pending_approvals)}")
-            report_lines.append(f"**Approved Items:** {len(state.get('approved_summaries', []))}")
-            report_lines.append("")
-        
-        return "\n".join(report_lines)
+            out.write(f"""
+## Analytics
+**Total Queries:** {len(st.session_state.query_history)}
+**Pending Approvals:** {len(st.session_state.pending_approvals)}
+**Approved Items:** {len(state.get('approved_summaries', []))}
+""")
+    
+    def _format_report_result(self, index: int, response: Dict[str, Any]) -> str:
+        """Format one research result block of the report"""
+        block = (
+            f"### Result {index}\n"
+            f"**Type:** {response.get('response_type', 'unknown')}\n"
+            f"**Confidence:** {response.get('confidence_score', 0):.1%}\n"
+        )
+        if 'summaries' in response:
+            block += "**Literature Summaries:**\n" + "".join(f"- {summary['title']}\n" for summary in response['summaries'])
+        return block
 
 def main():
     """Main function to run the Streamlit app"""
@@ -5,8 +5,19 @@ Test Google AI API key with simple HTTP request
 
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+# One keep-alive session reused across calls; transient 5xx responses are retried with backoff
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=1,
+    # raise_on_status=False hands back the last 5xx response instead of a RetryError whose message holds the keyed URL
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(500, 502, 503, 504), raise_on_status=False)
+))
+
 def test_api_key():
     load_dotenv()
     api_key = os.getenv('GOOGLE_API_KEY')
@@ -21,7 +32,7 @@ def test_api_key():
     url = f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}"
     
     try:
-        response = requests.get(url)
+        response = _SESSION.get(url, timeout=10)
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
@@ -10,9 +10,6 @@ def test_api_key_loading():
     print("🔍 Testing Google API Key Configuration...")
     print("=" * 50)
     
-    # Load environment variables
-    load_dotenv()
-    
     # Check if .env file exists
     env_file = ".env"
     if os.path.exists(env_file):
@@ -21,6 +18,9 @@ def test_api_key_loading():
         print(f"❌ .env file not found: {env_file}")
         return False
     
+    # Load environment variables from the file just found, skipping find_dotenv's directory search
+    load_dotenv(env_file)
+    
     # Try to read API key
     api_key = os.getenv('GOOGLE_API_KEY')
     mock_mode = os.getenv('MOCK_EXTERNAL_APIS', 'false').lower() == 'true'
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script to verify memory retrieval in the state manager
+"""
+
+from healthcare_schema import create_initial_state, create_literature_summary
+from state_management import HealthcareStateManager
+
+def _retrieval_state(disease_focus, treatment_focus, key_finding, disease_condition, query_text):
+    state = create_initial_state("researcher_1", "project_1", disease_focus)
+    state["literature_summaries"].append(create_literature_summary(
+        "Study", ["Author"], "2024-01-01", "Journal", "Abstract",
+        [key_finding], treatment_focus, "Adults"
+    ))
+    state["comparative_findings"].append({
+        "comparison_id": "comparison_1",
+        "treatments": ["Insulin"],
+        "disease_condition": disease_condition,
+        "efficacy_metrics": {},
+        "side_effects": {},
+        "population_differences": {},
+        "recommendation": "",
+        "confidence_level": "medium",
+        "sources": []
+    })
+    state["current_queries"].append({"query_id": "q1", "query_text": query_text})
+    return state
+
+def _retrieved(state):
+    manager = HealthcareStateManager()
+    manager.process_query_node(state)
+    manager.retrieve_memory_node(state)
+    retrievals = [r for r in state["session_responses"] if r.get("type") == "memory_retrieval"]
+    if not retrievals:
+        return 0, 0
+    return len(retrievals[0]["summaries"]), len(retrievals[0]["comparisons"])
+
+def test_disease_focus_matches_punctuated_and_hyphenated_values():
+    print("🔍 Testing disease focus retrieval...")
+    state = _retrieval_state(
+        "Diabetes", "Diabetes-related neuropathy", "Unrelated finding",
+        "Type 2 Diabetes.", "clinical trial of statins"
+    )
+    assert _retrieved(state) == (1, 1)
+    print("✅ Hyphenated focus and punctuated condition both matched")
+
+def test_query_terms_match_punctuated_findings():
+    print("🔍 Testing key finding retrieval...")
+    state = _retrieval_state(
+        "Oncology", "Chemotherapy", "Metformin, improves glycemic control",
+        "Cancer", "clinical trial of metformin treatment"
+    )
+    assert _retrieved(state) == (1, 0)
+    print("✅ Query term matched a finding followed by punctuation")
+
+def test_query_terms_match_finding_word_prefixes():
+    print("🔍 Testing key finding prefix retrieval...")
+    state = _retrieval_state(
+        "Oncology", "Chemotherapy", "Statins reduce LDL",
+        "Cancer", "clinical trial of statin therapy"
+    )
+    assert _retrieved(state) == (1, 0)
+    print("✅ Query term matched the start of a longer finding word")
+
+def main():
+    print("🔬 MediSyn Labs - State Management Test")
+    print("=" * 50)
+
+    tests = [
+        test_disease_focus_matches_punctuated_and_hyphenated_values,
+        test_query_terms_match_punctuated_findings,
+        test_query_terms_match_finding_word_prefixes
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+            print(f"❌ {test.__name__} failed")
+
+    print("\n📋 Test Summary")
+    print("=" * 50)
+    if failed:
+        print(f"❌ {failed} of {len(tests)} tests failed.")
+    else:
+        print("✅ All tests passed!")
+
+if __name__ == "__main__":
+    main()